@@ -7,22 +7,46 @@ except ImportError:
 
 plt.ion()
 
+# Re-emit the figure into notebook output only every N games
+DISPLAY_EVERY = 10
+
+class _PlotState:
+    """Figure and artists created once, then updated in place on every plot()"""
+    def __init__(self):
+        self.fig, self.ax = plt.subplots()
+        self.ax.set_title("Training...")
+        self.ax.set_xlabel('Number of Games')
+        self.ax.set_ylabel('Score')
+        self.line_scores, = self.ax.plot([], [])
+        self.line_mean, = self.ax.plot([], [])
+        self.text_scores = self.ax.text(0, 0, '')
+        self.text_mean = self.ax.text(0, 0, '')
+        self.updates = 0
+        plt.show(block=False)
+
+_state = None
+
 def plot(scores, mean_scores):
-    if IPython_available:
+    global _state
+    if _state is None:
+        _state = _PlotState()
+
+    # Update the existing artists instead of clearing and re-plotting everything
+    x = range(len(scores))
+    _state.line_scores.set_data(x, scores)
+    _state.line_mean.set_data(x, mean_scores)
+    _state.text_scores.set_position((len(scores)-1, scores[-1]))
+    _state.text_scores.set_text(str(scores[-1]))
+    _state.text_mean.set_position((len(mean_scores)-1, mean_scores[-1]))
+    _state.text_mean.set_text(str(mean_scores[-1]))
+    _state.ax.relim()
+    _state.ax.autoscale_view()
+    _state.ax.set_ylim(bottom=0, auto=None)
+
+    _state.fig.canvas.draw_idle()
+    _state.fig.canvas.flush_events()
+
+    _state.updates += 1
+    if IPython_available and _state.updates % DISPLAY_EVERY == 0:
         display.clear_output(wait=True)
-        display.display(plt.gcf())
-
-    plt.clf()
-    plt.title("Training...")
-    plt.xlabel('Number of Games')
-    plt.ylabel('Score')
-    plt.plot(scores)
-    plt.plot(mean_scores)
-    plt.ylim(ymin=0)
-    plt.text(len(scores)-1,scores[-1],str(scores[-1]))
-    plt.text(len(mean_scores)-1,mean_scores[-1],str(mean_scores[-1]))
-    plt.draw()
-    if IPython_available:
-        plt.show(block=False)
-    else:
-        plt.pause(.1)
+        display.display(_state.fig)
@@ -0,0 +1,65 @@
+import numpy as np
+try:
+    from numba import njit
+    numba_available = True
+except ImportError:
+    numba_available = False
+
+# Compiled hot-path helpers for the game loop. Without numba the same
+# functions fall back to NumPy so the game still runs, just slower.
+
+if numba_available:
+    @njit(cache=True)
+    def body_hits(body, head_idx, n, hx, hy):
+        """True if (hx, hy) is on one of the n ring-buffer segments behind the head"""
+        cap = body.shape[0]
+        for i in range(1, n):
+            j = (head_idx - i) % cap
+            if body[j, 0] == hx and body[j, 1] == hy:
+                return True
+        return False
+else:
+    def body_hits(body, head_idx, n, hx, hy):
+        """True if (hx, hy) is on one of the n ring-buffer segments behind the head"""
+        idx = (head_idx - np.arange(1, n)) % body.shape[0]
+        return bool(((body[idx, 0] == hx) & (body[idx, 1] == hy)).any())
+
+
+def _state_flags(hx, hy, fx, fy, direction, row_mask, cols, out):
+    """Write the 11 agent state flags into out. Positions are in grid cells,
+    direction is 0..3 clockwise from right, bit x of row_mask[y] is set on body cells."""
+    rows = row_mask.shape[0]
+    in_row = 0 <= hy < rows
+    in_col = 0 <= hx < cols
+
+    # Wall or body in each neighbouring cell; a neighbour off the board along
+    # either axis counts as a wall (the head itself is off it after a crash)
+    col_r = not (in_row and 0 <= hx + 1 < cols) or (row_mask[hy] >> (hx + 1)) & 1 != 0
+    col_d = not (in_col and 0 <= hy + 1 < rows) or (row_mask[hy + 1] >> hx) & 1 != 0
+    col_l = not (in_row and 0 <= hx - 1 < cols) or (row_mask[hy] >> (hx - 1)) & 1 != 0
+    col_u = not (in_col and 0 <= hy - 1 < rows) or (row_mask[hy - 1] >> hx) & 1 != 0
+
+    dir_r = direction == 0
+    dir_d = direction == 1
+    dir_l = direction == 2
+    dir_u = direction == 3
+
+    # Danger straight, right, left
+    out[0] = (dir_u and col_u) or (dir_d and col_d) or (dir_l and col_l) or (dir_r and col_r)
+    out[1] = (dir_u and (col_r or col_u)) or (dir_d and (col_l or col_d))
+    out[2] = (dir_u and col_r) or (dir_d and col_l) or (dir_r and col_u) or (dir_l and col_d)
+
+    # Direction flags
+    out[3] = dir_l
+    out[4] = dir_r
+    out[5] = dir_u
+    out[6] = dir_d
+
+    # Food location
+    out[7] = fx < hx
+    out[8] = fx > hx
+    out[9] = fy < hy
+    out[10] = fy > hy
+
+# Pure integer code, so the same body serves as the fallback
+state_flags = njit(cache=True)(_state_flags) if numba_available else _state_flags
@@ -6,23 +6,44 @@ import numpy as np
 import os
 
 class Linear_QNet(nn.Module):
-    def __init__(self,input_size,hidden_size,output_size):
+    def __init__(self,input_size,hidden_size,output_size,device=None,static_shapes=False):
         super().__init__()
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        if device is None:
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self.device = torch.device(device)
 
         # Optimized model architecture for GPU
         self.linear1 = nn.Linear(input_size,hidden_size).to(self.device)
         self.linear2 = nn.Linear(hidden_size,output_size).to(self.device)
 
         # Performance optimizations
-        if torch.cuda.is_available():
-            # Enable autocast for mixed precision
+        if self.device.type == 'cuda':
+            # Enable autocast for mixed precision; bf16 keeps FP32's range, so it
+            # needs no loss scaling, fp16 is the fallback on older GPUs
             self.use_amp = True
+            self.amp_dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
         else:
             self.use_amp = False
+            self.amp_dtype = torch.bfloat16
+
+        # Compile the forward once on GPU; the net is so small that Python
+        # dispatch dominates, so fusing it into one graph is the main win.
+        # static_shapes gives each batch size its own captured graph; only for callers
+        # that use a few fixed shapes, otherwise the recompile limit is soon exhausted
+        if self.device.type == 'cuda':
+            self._forward_impl = torch.compile(self._forward, mode='reduce-overhead', fullgraph=True,
+                                               dynamic=False if static_shapes else None)
+        else:
+            self._forward_impl = self._forward
         
     
     def forward(self, x):
+        # Always run as [B, 11] so the compiled graph sees a stable rank
+        if x.dim() == 1:
+            return self._forward_impl(x.unsqueeze(0)).squeeze(0)
+        return self._forward_impl(x)
+
+    def _forward(self, x):
         x = F.relu(self.linear1(x))
         x = self.linear2(x)
         return x
@@ -38,44 +59,254 @@ class QTrainer:
         self.lr = lr
         self.gamma = gamma
         self.model = model
+        self.device = self.model.device
         self.optimer = optim.Adam(model.parameters(),lr = self.lr)    
         self.criterion = nn.MSELoss()
+        # Mixed precision: only active when the model asked for it (CUDA);
+        # the grad scaler is only needed for fp16
+        self.amp_device = self.model.device.type
+        self.amp_dtype = self.model.amp_dtype
+        self.scaler = torch.amp.GradScaler(self.amp_device,
+                                           enabled=self.model.use_amp and self.amp_dtype == torch.float16)
         for i in self.model.parameters():
             print(i.is_cuda)
 
+    def _to_device(self,x,dtype):
+        # Tensors (e.g. batches already copied by ReplayBuffer) are used as they are;
+        # array-likes are wrapped with from_numpy so the only copy is the one to the device
+        if not torch.is_tensor(x):
+            x = torch.from_numpy(np.asarray(x))
+        return x.to(self.device,dtype=dtype,non_blocking=True)
     
-    def train_step(self,state,action,reward,next_state,done):
-        device = self.model.device
+    def train_step(self,state,action,reward,next_state,done,weights=None):
+        # weights: optional per-sample importance-sampling weights (prioritized replay).
+        # Returns the absolute TD errors of the batch
+        device = self.device
         # Optimize tensor creation for better GPU performance
-        state = torch.tensor(np.array(state),dtype=torch.float).to(device)
-        next_state = torch.tensor(np.array(next_state),dtype=torch.float).to(device)
-        action = torch.tensor(np.array(action),dtype=torch.long).to(device)
-        reward = torch.tensor(np.array(reward),dtype=torch.float).to(device)
+        state = self._to_device(state,torch.float32)
+        next_state = self._to_device(next_state,torch.float32)
+        action = self._to_device(action,torch.long)
+        reward = self._to_device(reward,torch.float32)
 
 
         if(len(state.shape) == 1): # only one parameter to train , Hence convert to tuple of shape (1, x)
             #(1 , x)
-            state = torch.unsqueeze(state,0).to(device)
-            next_state = torch.unsqueeze(next_state,0).to(device)
-            action = torch.unsqueeze(action,0).to(device)
-            reward = torch.unsqueeze(reward,0).to(device)
+            state = torch.unsqueeze(state,0)
+            next_state = torch.unsqueeze(next_state,0)
+            action = torch.unsqueeze(action,0)
+            reward = torch.unsqueeze(reward,0)
             done = (done, )
 
 
 
         # 1. Predicted Q value with current state
-        pred = self.model(state).to(device)
-        target = pred.clone().to(device)
-        for idx in range(len(done)):
-            Q_new = reward[idx]
-            if not done[idx]:
-                Q_new = reward[idx] + self.gamma * torch.max(self.model(next_state[idx])).to(device)
-            target[idx][torch.argmax(action).item()] = Q_new
-        # 2. Q_new = reward + gamma * max(next_predicted Qvalue) -> only do this if not done
-        # pred.clone()
-        # preds[argmax(action)] = Q_new
+        with torch.amp.autocast(self.amp_device, dtype=self.amp_dtype, enabled=self.model.use_amp):
+            pred = self.model(state)
+
+            # 2. Q_new = reward + gamma * max(next_predicted Qvalue) -> only do this if not done
+            # Computed for the whole batch at once, without a per-sample loop
+            with torch.no_grad():
+                q_next = self.model(next_state).max(dim=1).values
+
+        # Target is built in FP32 outside autocast
+        done = torch.as_tensor(done, dtype=torch.bool, device=device)
+        q_new = reward + self.gamma * q_next.float() * (~done).float()
+
+        # preds[action] = Q_new, using each sample's own action index (one-hot actions are reduced with argmax)
+        act_idx = action.argmax(dim=1) if action.dim() > 1 else action
+        rows = torch.arange(len(done), device=device)
+        target = pred.detach().float().clone()
+        td_error = q_new - target[rows, act_idx]
+        target[rows, act_idx] = q_new
         self.optimer.zero_grad()
-        loss = self.criterion(target,pred)
-        loss.backward()
+        with torch.amp.autocast(self.amp_device, dtype=self.amp_dtype, enabled=self.model.use_amp):
+            if weights is None:
+                loss = self.criterion(target,pred)
+            else:
+                # Same MSE, with each sample's error scaled by its weight
+                weights = self._to_device(weights,torch.float32)
+                loss = (weights * F.mse_loss(pred.float(),target,reduction='none').mean(dim=1)).mean()
+        self.scaler.scale(loss).backward()
+
+        self.scaler.step(self.optimer)
+        self.scaler.update()
+        return td_error.abs()
+
+class ReplayBuffer:
+    """Experience memory stored as preallocated ring-buffer arrays, one per field.
+    Actions are stored as integer indices.
+
+    Storage is in host memory by default. With on_device=True it lives on the learner's
+    device instead, which suits batched writers (push_batch): the whole buffer is a few MB,
+    and sampled batches never cross the bus, but every write becomes a host-to-device copy."""
+    def __init__(self,capacity,state_size=11,state_dtype=torch.float32,device='cpu',on_device=False):
+        self.capacity = capacity
+        self.device = torch.device(device)
+        storage = self.device if on_device else torch.device('cpu')
+
+        # Host storage for a CUDA learner is page-locked, so batch copies can run asynchronously
+        pin = self.device.type == 'cuda' and storage.type == 'cpu'
+        self._fields = (
+            torch.zeros((capacity,state_size),dtype=state_dtype,device=storage,pin_memory=pin),
+            torch.zeros(capacity,dtype=torch.int8,device=storage,pin_memory=pin),
+            torch.zeros(capacity,dtype=torch.float32,device=storage,pin_memory=pin),
+            torch.zeros((capacity,state_size),dtype=state_dtype,device=storage,pin_memory=pin),
+            torch.zeros(capacity,dtype=torch.bool,device=storage,pin_memory=pin),
+        )
+        # In host memory, NumPy views of the same memory for cheap per-step writes
+        self._numpy = storage.type == 'cpu'
+        if self._numpy:
+            self.states,self.actions,self.rewards,self.next_states,self.dones = (t.numpy() for t in self._fields)
+        else:
+            self.states,self.actions,self.rewards,self.next_states,self.dones = self._fields
+        self.pos = 0
+        self.size = 0
+
+        if pin:
+            # Pinned staging for sampled batches, copied to the GPU on a side stream
+            self._staging = None
+            self._stream = torch.cuda.Stream(self.device)
+            self._copy_done = torch.cuda.Event()
+
+    def __len__(self):
+        return self.size
+
+    def _write(self,idx,values):
+        fields = (self.states,self.actions,self.rewards,self.next_states,self.dones)
+        if self._numpy:
+            for field,value in zip(fields,values):
+                field[idx] = value
+            return
+        # One host-to-device copy per field, cast to the field dtype on the way
+        if isinstance(idx,np.ndarray):
+            idx = torch.from_numpy(idx).to(self.device,non_blocking=True)
+        for field,value in zip(fields,values):
+            field[idx] = torch.as_tensor(np.asarray(value)).to(self.device,dtype=field.dtype,non_blocking=True)
+
+    def push(self,state,action,reward,next_state,done):
+        # Overwrites the oldest experience once the buffer is full
+        self._write(self.pos,(state,action,reward,next_state,done))
+        self.pos = (self.pos + 1) % self.capacity
+        self.size = min(self.size + 1,self.capacity)
+
+    def push_batch(self,states,actions,rewards,next_states,dones):
+        # Same as push for N experiences at once, wrapping around the end of the buffer
+        n = len(states)
+        idx = (self.pos + np.arange(n)) % self.capacity
+        self._write(idx,(states,actions,rewards,next_states,dones))
+        self.pos = (self.pos + n) % self.capacity
+        self.size = min(self.size + n,self.capacity)
+
+    def sample(self,batch_size):
+        # Whole memory while it is smaller than a batch, random indices otherwise
+        if self._numpy:
+            if self.size <= batch_size:
+                idx = np.arange(self.size)
+            else:
+                idx = np.random.randint(0,self.size,batch_size)
+            return self._gather(idx)
+
+        # Indices drawn on the device, so sampling is pure device-side gathers
+        if self.size <= batch_size:
+            idx = torch.arange(self.size,device=self.device)
+        else:
+            idx = torch.randint(0,self.size,(batch_size,),device=self.device)
+        return self._gather(idx)
+
+    def _gather(self,idx):
+        if self._numpy:
+            if self.device.type == 'cuda':
+                return self._sample_to_device(torch.from_numpy(idx))
+            return (self.states[idx],self.actions[idx],self.rewards[idx],
+                    self.next_states[idx],self.dones[idx])
+        if isinstance(idx,np.ndarray):
+            idx = torch.from_numpy(idx).to(self.device,non_blocking=True)
+        return tuple(t[idx] for t in self._fields)
+
+    def _sample_to_device(self,idx):
+        n = len(idx)
+        if self._staging is None or self._staging[0].shape[0] < n:
+            self._staging = [torch.empty((n,)+t.shape[1:],dtype=t.dtype,pin_memory=True)
+                             for t in self._fields]
+
+        # The previous async copy must be done reading the staging buffers before they are reused
+        self._copy_done.synchronize()
+        staged = [torch.index_select(t,0,idx,out=buf[:n]) for t,buf in zip(self._fields,self._staging)]
+
+        # Issue the H2D copies on the side stream; the compute stream waits for them
+        # before the forward pass instead of the host blocking on them
+        with torch.cuda.stream(self._stream):
+            batch = [buf.to(self.device,non_blocking=True) for buf in staged]
+            self._copy_done.record()
+        compute = torch.cuda.current_stream(self.device)
+        compute.wait_stream(self._stream)
+        for t in batch:
+            t.record_stream(compute)
+        return tuple(batch)
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """ReplayBuffer that samples experiences in proportion to priority**alpha, where
+    the priority is the last |TD error| (proportional prioritized replay).
+    Priorities are kept in a NumPy sum tree over the ring-buffer slots."""
+    def __init__(self,capacity,alpha=0.6,beta=0.4,beta_steps=100_000,eps=1e-5,**kwargs):
+        super().__init__(capacity,**kwargs)
+        self.alpha = alpha
+        self.beta = beta
+        # beta is annealed to 1 over beta_steps calls to sample()
+        self.beta_increment = (1.0 - beta) / beta_steps
+        self.eps = eps
+        self.max_priority = 1.0
+
+        # Leaves hold priority**alpha, each inner node the sum of its two children;
+        # node 1 is the root, so _tree[1] is the total
+        self._depth = max(1,(capacity - 1).bit_length())
+        self._leaves = 1 << self._depth
+        self._tree = np.zeros(2 * self._leaves,dtype=np.float64)
+
+    def _set_priorities(self,idx,values):
+        pos = np.asarray(idx) + self._leaves
+        self._tree[pos] = values
+        # Recompute the affected parents level by level (duplicate indices are harmless)
+        for _ in range(self._depth):
+            pos = np.unique(pos // 2)
+            self._tree[pos] = self._tree[2 * pos] + self._tree[2 * pos + 1]
+
+    def _find(self,values):
+        # Descend from the root for every value at once, to the leaf whose prefix-sum range holds it
+        pos = np.ones(len(values),dtype=np.int64)
+        for _ in range(self._depth):
+            left = 2 * pos
+            go_right = values > self._tree[left]
+            values = np.where(go_right,values - self._tree[left],values)
+            pos = np.where(go_right,left + 1,left)
+        # Rounding can step past the last written slot, whose neighbours have priority 0
+        return np.minimum(pos - self._leaves,self.size - 1)
+
+    def push(self,state,action,reward,next_state,done):
+        # New experiences get the highest priority seen so far, so each is replayed at least once
+        i = self.pos
+        super().push(state,action,reward,next_state,done)
+        self._set_priorities(i,self.max_priority ** self.alpha)
+
+    def push_batch(self,states,actions,rewards,next_states,dones):
+        idx = (self.pos + np.arange(len(states))) % self.capacity
+        super().push_batch(states,actions,rewards,next_states,dones)
+        self._set_priorities(idx,self.max_priority ** self.alpha)
+
+    def sample(self,batch_size):
+        """Returns the batch fields plus the sampled indices and their importance-sampling weights"""
+        # One uniform draw per equal-sized segment of the total priority mass
+        total = self._tree[1]
+        values = (np.arange(batch_size) + np.random.rand(batch_size)) * (total / batch_size)
+        idx = self._find(values)
+
+        probs = self._tree[idx + self._leaves] / total
+        weights = (self.size * probs) ** -self.beta
+        weights = (weights / weights.max()).astype(np.float32)
+        self.beta = min(1.0,self.beta + self.beta_increment)
+        return self._gather(idx) + (idx,weights)
 
-        self.optimer.step()
+    def update_priorities(self,idx,td_errors):
+        priorities = np.abs(td_errors) + self.eps
+        self.max_priority = max(self.max_priority,float(priorities.max()))
+        self._set_priorities(idx,priorities ** self.alpha)
@@ -8,9 +8,11 @@ import torch
 import cv2
 import numpy as np
 import pygame
+import queue
+import threading
 from pygame.locals import *
 from collections import deque
-from snake_gameai import SnakeGameAI, Direction, Point, BLOCK_SIZE
+from snake_gameai import SnakeGameAI, Point, BLOCK_SIZE, DIRECTION_INDEX, DANGER_MASK
 # Import game speed for matching recording FPS
 from snake_gameai import SPEED
 from model import Linear_QNet, QTrainer
@@ -18,39 +20,79 @@ from model import Linear_QNet, QTrainer
 class VideoRecorder:
     """Records pygame gameplay to video file"""
 
-    def __init__(self, output_filename='testreinf.mp4', fps=10):
+    def __init__(self, output_filename='testreinf.mp4', fps=10, queue_size=8):
         self.output_filename = output_filename
         self.fps = fps
+        self.queue_size = queue_size
         self.frames = []
         self.recording = False
 
     def start_recording(self, width=640, height=480):
         """Initialize video writer"""
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        self.video_writer = cv2.VideoWriter(self.output_filename, fourcc, self.fps, (width, height))
+        self.video_writer = self._open_writer(width, height)
+
+        # Encoding runs on a background thread so the game loop never waits on the encoder.
+        # The queue is bounded: if the encoder falls more than queue_size frames behind,
+        # capture_frame blocks until a slot frees up (backpressure instead of unbounded memory).
+        self._frame_queue = queue.Queue(maxsize=self.queue_size)
+
+        # Preallocated frame buffers recycled between capture_frame and the writer:
+        # one per queue slot, plus one being filled and one being encoded
+        self._free_frames = queue.Queue()
+        for _ in range(self.queue_size + 2):
+            self._free_frames.put(np.empty((height, width, 3), dtype=np.uint8))
+        self._writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer_thread.start()
         self.recording = True
         print(f"🎥 STARTED RECORDING: {self.output_filename}")
-        print(f"📐 Resolution: {width}x{height} | FPS: {self.fps}")
+        print(f"📐 Resolution: {width}x{height} | FPS: {self.fps} | Codec: {self.codec}")
+
+    def _open_writer(self, width, height):
+        """Prefer hardware-accelerated H.264 through FFmpeg, fall back to software mp4v"""
+        if cv2.CAP_FFMPEG in cv2.videoio_registry.getWriterBackends():
+            writer = cv2.VideoWriter(self.output_filename, cv2.CAP_FFMPEG, cv2.VideoWriter_fourcc(*'avc1'),
+                                     self.fps, (width, height),
+                                     [cv2.VIDEOWRITER_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+            if writer.isOpened():
+                self.codec = 'avc1'
+                return writer
+
+        # No FFmpeg backend or no H.264 encoder available
+        self.codec = 'mp4v'
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        return cv2.VideoWriter(self.output_filename, fourcc, self.fps, (width, height))
 
     def capture_frame(self, surface):
         """Capture current pygame surface"""
         if not self.recording:
             return
 
-        # Convert pygame surface to OpenCV format
-        frame_string = pygame.image.tostring(surface, 'RGB')
-        frame_np = np.frombuffer(frame_string, dtype=np.uint8)
-        frame_np = frame_np.reshape((surface.get_height(), surface.get_width(), 3))
+        # Zero-copy view of the surface pixels (pygame is column-major, so swap to rows first)
+        frame_view = pygame.surfarray.pixels3d(surface).swapaxes(0, 1)
 
-        # Convert RGB to BGR (OpenCV format)
-        frame_bgr = cv2.cvtColor(frame_np, cv2.COLOR_RGB2BGR)
+        # Convert RGB to BGR (OpenCV format) as a stride view, copied once into a recycled buffer
+        frame_bgr = self._free_frames.get()
+        np.copyto(frame_bgr, frame_view[..., ::-1])
+        del frame_view  # Release the surface lock
 
-        # Write frame to video
-        self.video_writer.write(frame_bgr)
+        # Hand the frame to the writer thread (blocks only while the queue is full)
+        self._frame_queue.put(frame_bgr)
+
+    def _writer_loop(self):
+        """Write queued frames until the None sentinel arrives"""
+        while True:
+            frame = self._frame_queue.get()
+            if frame is None:
+                break
+            self.video_writer.write(frame)
+            self._free_frames.put(frame)
 
     def stop_recording(self):
         """Finalize and save the video"""
         if self.recording:
+            # Drain the remaining frames before closing the file
+            self._frame_queue.put(None)
+            self._writer_thread.join()
             self.video_writer.release()
             self.recording = False
             print(f"✅ RECORDING COMPLETE: {self.output_filename}")
@@ -59,20 +101,27 @@ class VideoRecorder:
 class RecordedTrainedAgent:
     """Agent that loads and uses the trained model for video recording"""
 
-    def __init__(self):
+    def __init__(self, device='cpu'):
         self.n_game = 0
         self.epsilon = 0  # No exploration during recording
         self.gamma = 0.9
         self.memory = deque(maxlen=100_000)
 
         # Load the trained model
-        self.model = Linear_QNet(11, 256, 3)
+        # Inference is one 11-dim forward per frame, so it defaults to the CPU:
+        # a GPU round-trip costs more than the whole matmul
+        self.model = Linear_QNet(11, 256, 3, device=device)
+        torch.set_num_threads(1)  # Don't compete with pygame for cores
         self.trainer = QTrainer(self.model, lr=0.001, gamma=self.gamma)
 
         # Load saved weights
         model_path = './models/model.pth'
         try:
-            self.model.load_state_dict(torch.load(model_path))
+            self.model.load_state_dict(torch.load(model_path, map_location=self.model.device))
+            # FP16 halves weight/activation traffic on GPU; CPU stays in FP32
+            self.dtype = torch.float16 if self.model.device.type == 'cuda' else torch.float32
+            self.model.to(self.dtype)
+            self.model.eval()
             print("🎯 SUCCESSFULLY LOADED TRAINED MODEL!")
             print(f"📁 Model loaded from: {model_path}")
         except FileNotFoundError:
@@ -88,54 +137,38 @@ class RecordedTrainedAgent:
         """Extract 11-dimensional state representation"""
         head = game.snake[0]
 
-        # Check points around head
-        point_l = Point(head.x - BLOCK_SIZE, head.y)
-        point_r = Point(head.x + BLOCK_SIZE, head.y)
-        point_u = Point(head.x, head.y - BLOCK_SIZE)
-        point_d = Point(head.x, head.y + BLOCK_SIZE)
+        # Check the 4 points around head once: [left, right, up, down]
+        collisions = np.array([
+            game.is_collision(Point(head.x - BLOCK_SIZE, head.y)),
+            game.is_collision(Point(head.x + BLOCK_SIZE, head.y)),
+            game.is_collision(Point(head.x, head.y - BLOCK_SIZE)),
+            game.is_collision(Point(head.x, head.y + BLOCK_SIZE)),
+        ], dtype=bool)
 
-        # Current direction flags
-        dir_l = game.direction == Direction.LEFT
-        dir_r = game.direction == Direction.RIGHT
-        dir_u = game.direction == Direction.UP
-        dir_d = game.direction == Direction.DOWN
+        # Current direction in the same layout
+        dir_idx = DIRECTION_INDEX[game.direction]
 
         # 11-dimensional state vector
-        state = [
-            # Danger Straight
-            (dir_u and game.is_collision(point_u)) or
-            (dir_d and game.is_collision(point_d)) or
-            (dir_l and game.is_collision(point_l)) or
-            (dir_r and game.is_collision(point_r)),
-
-            # Danger right
-            (dir_u and game.is_collision(point_r)) or
-            (dir_d and game.is_collision(point_l)) or
-            (dir_u and game.is_collision(point_u)) or
-            (dir_d and game.is_collision(point_d)),
-
-            # Danger Left
-            (dir_u and game.is_collision(point_r)) or
-            (dir_d and game.is_collision(point_l)) or
-            (dir_r and game.is_collision(point_u)) or
-            (dir_l and game.is_collision(point_d)),
-
-            # Direction flags
-            dir_l, dir_r, dir_u, dir_d,
-
-            # Food location relative to head
-            game.food.x < game.head.x,  # food left
-            game.food.x > game.head.x,  # food right
-            game.food.y < game.head.y,  # food up
-            game.food.y > game.head.y   # food down
-        ]
-
-        return np.array(state, dtype=int)
+        state = np.zeros(11, dtype=np.float32)
+
+        # Danger straight, right, left
+        state[0:3] = (DANGER_MASK[dir_idx] & collisions).any(axis=1)
+
+        # Direction flags
+        state[3 + dir_idx] = 1
+
+        # Food location relative to head
+        state[7] = game.food.x < head.x  # food left
+        state[8] = game.food.x > head.x  # food right
+        state[9] = game.food.y < head.y  # food up
+        state[10] = game.food.y > head.y  # food down
+
+        return state
 
     def get_action(self, state):
         """Get optimal action from trained model (no exploration)"""
         # Pure exploitation - use trained model only
-        state_tensor = torch.tensor(state, dtype=torch.float).to(self.model.device)
+        state_tensor = torch.as_tensor(state, dtype=self.dtype, device=self.model.device)
         with torch.no_grad():
             prediction = self.model(state_tensor)
 
@@ -2,6 +2,8 @@ import pygame
 import random
 from enum import Enum
 from collections import namedtuple
+import numpy as np
+from helpers_numba import body_hits
 pygame.init()
 try:
     font = pygame.font.Font('arial.ttf',25)
@@ -39,23 +41,67 @@ class SnakeGame:
         self.display = pygame.display.set_mode((self.w,self.h))
         pygame.display.set_caption('Snake')
         self.clock = pygame.time.Clock()
+
+        # Grid cells packed as row*cols + col, used to find free cells for food
+        self._cols = self.w//BLOCK_SIZE
+        self._all_cells = np.arange(self._cols*(self.h//BLOCK_SIZE))
+
+        # Static UI pieces are rendered once and blitted every frame
+        self._bg_surface = self._render_background()
+        self._food_label = font.render("anuj",True,BLACK)
+        self._seg_surf = pygame.Surface((BLOCK_SIZE,BLOCK_SIZE))
+        self._seg_surf.fill(BLUE1)
+        pygame.draw.rect(self._seg_surf,BLUE2,pygame.Rect(4,4,12,12))
+        self._food_surf = self._render_food()
+        self._score_value = None
+        self._score_text = None
         
         #init game state
         self.direction = Direction.RIGHT
-        self.head = Point(self.w/2,self.h/2)
-        self.snake = [self.head,
-                      Point(self.head.x-BLOCK_SIZE,self.head.y),
-                      Point(self.head.x-(2*BLOCK_SIZE),self.head.y)]
+        self.head = Point(self.w//2,self.h//2)
+
+        # Snake body as a ring buffer of (x, y) rows: the head is written at
+        # _head_idx and moves forward, the tail is at _tail_idx
+        self._max_len = (self.w//BLOCK_SIZE)*(self.h//BLOCK_SIZE) + 1
+        self._body = np.empty((self._max_len,2),dtype=np.int16)
+        self._body[:3] = [(self.head.x-(2*BLOCK_SIZE),self.head.y),
+                          (self.head.x-BLOCK_SIZE,self.head.y),
+                          (self.head.x,self.head.y)]
+        self._tail_idx = 0
+        self._head_idx = 2
+        self._len = 3
         self.score = 0
         self.food = None
         self._place__food()
 
+    @property
+    def snake(self):
+        """Body segments as Points, head first"""
+        return [Point(x,y) for x,y in self._body[self._body_indices()].tolist()]
+
+    def _body_indices(self):
+        # Ring-buffer rows from head to tail
+        return (self._head_idx - np.arange(self._len)) % self._max_len
+
+    def _push_head(self,pt):
+        self._head_idx = (self._head_idx + 1) % self._max_len
+        self._body[self._head_idx] = pt
+        self._len += 1
+
+    def _pop_tail(self):
+        self._tail_idx = (self._tail_idx + 1) % self._max_len
+        self._len -= 1
+
     def _place__food(self):
-        x = random.randint(0,(self.w-BLOCK_SIZE)//BLOCK_SIZE)*BLOCK_SIZE
-        y = random.randint(0,(self.h-BLOCK_SIZE)//BLOCK_SIZE)*BLOCK_SIZE
-        self.food = Point(x,y)
-        if(self.food in self.snake):
-            self._place__food()
+        # Pick uniformly among the free cells: bounded cost, no recursion.
+        # Returns False when the snake fills the board and there is no cell left
+        body = self._body[self._body_indices()].astype(np.int32)//BLOCK_SIZE
+        free = np.setdiff1d(self._all_cells, body[:,1]*self._cols + body[:,0])
+        if len(free) == 0:
+            return False
+        cell = int(free[random.randrange(len(free))])
+        self.food = Point((cell % self._cols)*BLOCK_SIZE,(cell//self._cols)*BLOCK_SIZE)
+        return True
 
 
     def play_step(self):
@@ -75,7 +121,7 @@ class SnakeGame:
                     self.direction = Direction.DOWN
         # 2. Move
         self._move(self.direction)
-        self.snake.insert(0,self.head)
+        self._push_head(self.head)
 
         # 3. Check if game Over
         game_over = False 
@@ -85,9 +131,12 @@ class SnakeGame:
         # 4. Place new Food or just move
         if(self.head == self.food):
             self.score+=1
-            self._place__food()
+            if not self._place__food():
+                # Board full: the game is won
+                game_over=True
+                return game_over,self.score
         else:
-            self.snake.pop()
+            self._pop_tail()
         # 5. Update UI and clock
         self._update_ui()
         self.clock.tick(SPEED)
@@ -95,48 +144,59 @@ class SnakeGame:
         
         return game_over,self.score
 
-    def _update_ui(self):
-        self.display.fill(BLACK)
+    def _render_background(self):
+        """Render the static background (watermark + decorations) once"""
+        surface = pygame.Surface((self.w,self.h))
+        surface.fill(BLACK)
 
         # Draw background "ANUJ" watermark
         bg_font = pygame.font.SysFont('arial', 72, bold=True)
         bg_text = bg_font.render("ANUJ", True, (50, 50, 50))  # Dark gray, semi-transparent effect
         text_rect = bg_text.get_rect(center=(self.w//2, self.h//2))
-        self.display.blit(bg_text, text_rect)
+        surface.blit(bg_text, text_rect)
 
         # Draw some alcohol glass icons on background
-        self._draw_background_alcohol()
+        self._draw_background_alcohol(surface)
+        return surface
 
-        for pt in self.snake:
-            pygame.draw.rect(self.display,BLUE1,pygame.Rect(pt.x,pt.y,BLOCK_SIZE,BLOCK_SIZE))
-            pygame.draw.rect(self.display,BLUE2,pygame.Rect(pt.x+4,pt.y+4,12,12))
-
-        # Draw food as alcohol bottle with "anuj" text
-        pygame.draw.rect(self.display,RED,pygame.Rect(self.food.x,self.food.y,BLOCK_SIZE,BLOCK_SIZE))
+    def _render_food(self):
+        """Render the food sprite (alcohol bottle on red) once"""
+        surface = pygame.Surface((BLOCK_SIZE,BLOCK_SIZE))
+        surface.fill(RED)
 
         # Draw alcohol bottle icon (simple bottle shape)
-        bottle_x = self.food.x + 2
-        bottle_y = self.food.y + 2
-        bottle_w = BLOCK_SIZE - 4
-        bottle_h = BLOCK_SIZE - 4
+        bottle_x = 2
+        bottle_y = 2
 
         # Bottle neck
-        pygame.draw.rect(self.display,BLACK,pygame.Rect(bottle_x + 6, bottle_y, 8, 4))
+        pygame.draw.rect(surface,BLACK,pygame.Rect(bottle_x + 6, bottle_y, 8, 4))
         # Bottle body
-        pygame.draw.rect(self.display,BLACK,pygame.Rect(bottle_x + 4, bottle_y + 4, 12, 10))
+        pygame.draw.rect(surface,BLACK,pygame.Rect(bottle_x + 4, bottle_y + 4, 12, 10))
         # Bottle base
-        pygame.draw.rect(self.display,BLACK,pygame.Rect(bottle_x + 2, bottle_y + 13, 16, 3))
+        pygame.draw.rect(surface,BLACK,pygame.Rect(bottle_x + 2, bottle_y + 13, 16, 3))
+        return surface
 
-        # "anuj" text in center
-        food_text = font.render("anuj",True,BLACK)
-        text_rect = food_text.get_rect(center=(self.food.x + BLOCK_SIZE//2, self.food.y + BLOCK_SIZE//2))
-        self.display.blit(food_text, text_rect)
+    def _update_ui(self):
+        self.display.blit(self._bg_surface,(0,0))
 
-        text = font.render("Score: "+str(self.score),True,WHITE)
-        self.display.blit(text,[0,0])
+        # All segments in one blits() call instead of two draw calls per segment
+        self.display.blits([(self._seg_surf,pos) for pos in self._body[self._body_indices()].tolist()],doreturn=False)
+
+        # Draw food as alcohol bottle with "anuj" text
+        self.display.blit(self._food_surf,(self.food.x,self.food.y))
+
+        # "anuj" text in center
+        text_rect = self._food_label.get_rect(center=(self.food.x + BLOCK_SIZE//2, self.food.y + BLOCK_SIZE//2))
+        self.display.blit(self._food_label, text_rect)
+
+        # Score text only needs re-rendering when the score changes
+        if self.score != self._score_value:
+            self._score_value = self.score
+            self._score_text = font.render("Score: "+str(self.score),True,WHITE)
+        self.display.blit(self._score_text,[0,0])
         pygame.display.flip()
 
-    def _draw_background_alcohol(self):
+    def _draw_background_alcohol(self, surface):
         """Draw alcohol-themed background decorations"""
         # Draw some wine glasses in corners
         glass_positions = [(50, 50), (550, 50), (50, 400), (550, 400)]
@@ -144,11 +204,11 @@ class SnakeGame:
 
         for gx, gy in glass_positions:
             # Wine glass stem
-            pygame.draw.rect(self.display, glass_color, pygame.Rect(gx, gy+12, 2, 8))
+            pygame.draw.rect(surface, glass_color, pygame.Rect(gx, gy+12, 2, 8))
             # Wine glass base
-            pygame.draw.rect(self.display, glass_color, pygame.Rect(gx-4, gy+18, 10, 2))
+            pygame.draw.rect(surface, glass_color, pygame.Rect(gx-4, gy+18, 10, 2))
             # Wine glass bowl
-            pygame.draw.circle(self.display, glass_color, (gx+1, gy+8), 6, 1)
+            pygame.draw.circle(surface, glass_color, (gx+1, gy+8), 6, 1)
 
         # Draw beer mugs in other areas
         mug_positions = [(200, 100), (400, 350), (150, 300), (450, 150)]
@@ -156,11 +216,11 @@ class SnakeGame:
 
         for mx, my in mug_positions:
             # Mug body
-            pygame.draw.rect(self.display, mug_color, pygame.Rect(mx, my, 12, 15), 1)
+            pygame.draw.rect(surface, mug_color, pygame.Rect(mx, my, 12, 15), 1)
             # Mug handle
-            pygame.draw.circle(self.display, mug_color, (mx+12, my+7), 3, 1)
+            pygame.draw.circle(surface, mug_color, (mx+12, my+7), 3, 1)
             # Mug foam top
-            pygame.draw.line(self.display, mug_color, (mx+1, my+1), (mx+11, my+1))
+            pygame.draw.line(surface, mug_color, (mx+1, my+1), (mx+11, my+1))
 
     def _move(self,direction):
         x = self.head.x
@@ -178,9 +238,8 @@ class SnakeGame:
         #hit boundary
         if(self.head.x>self.w-BLOCK_SIZE or self.head.x<0 or self.head.y>self.h - BLOCK_SIZE or self.head.y<0):
             return True
-        if(self.head in self.snake[1:]):
-            return True
-        return False
+        # Compiled scan of every body segment except the head
+        return body_hits(self._body,self._head_idx,self._len,self.head.x,self.head.y)
 
 if __name__=="__main__":
     game = SnakeGame()
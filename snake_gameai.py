@@ -26,6 +26,23 @@ class Direction(Enum):
  
 Point = namedtuple('Point','x , y')
 
+# Position of each direction in the state vector / neighbour layout [left, right, up, down]
+DIRECTION_INDEX = {Direction.LEFT: 0, Direction.RIGHT: 1, Direction.UP: 2, Direction.DOWN: 3}
+
+# DANGER_MASK[direction][danger] selects which neighbour collisions (same
+# [left, right, up, down] layout) raise danger straight / right / left.
+# This is the exact encoding the models were trained with.
+DANGER_MASK = np.array([
+    # moving left
+    [[1,0,0,0], [0,0,0,0], [0,0,0,1]],
+    # moving right
+    [[0,1,0,0], [0,0,0,0], [0,0,1,0]],
+    # moving up
+    [[0,0,1,0], [0,1,1,0], [0,1,0,0]],
+    # moving down
+    [[0,0,0,1], [1,0,0,1], [1,0,0,0]],
+], dtype=bool)
+
 BLOCK_SIZE=20
 # Optimized speed for faster training on GPU
 SPEED = 60 if torch.cuda.is_available() else 40
@@ -36,13 +53,32 @@ BLUE2 = (0,100,255)
 BLACK = (0,0,0)
 
 class SnakeGameAI:
-    def __init__(self,w=640,h=480):
+    def __init__(self,w=640,h=480,render=True):
         self.w=w
         self.h=h
+        # render=False: no window, no drawing and no frame-rate cap (training)
+        self.render = render
         #init display
-        self.display = pygame.display.set_mode((self.w,self.h))
-        pygame.display.set_caption('Snake')
+        if self.render:
+            self.display = pygame.display.set_mode((self.w,self.h))
+            pygame.display.set_caption('Snake')
+        else:
+            self.display = pygame.Surface((self.w,self.h))
         self.clock = pygame.time.Clock()
+
+        # Every grid cell food can land on
+        self._all_cells = [(x,y) for x in range(0,self.w-BLOCK_SIZE+1,BLOCK_SIZE)
+                                 for y in range(0,self.h-BLOCK_SIZE+1,BLOCK_SIZE)]
+
+        # Static UI pieces are rendered once and blitted every frame
+        self._bg_surface = self._render_background()
+        self._food_label = font.render("anuj",True,BLACK)
+        self._seg_surf = pygame.Surface((BLOCK_SIZE,BLOCK_SIZE))
+        self._seg_surf.fill(BLUE1)
+        pygame.draw.rect(self._seg_surf,BLUE2,pygame.Rect(4,4,12,12))
+        self._food_surf = self._render_food()
+        self._score_value = None
+        self._score_text = None
         
         #init game state
         self.reset()
@@ -59,17 +95,20 @@ class SnakeGameAI:
       
 
     def _place__food(self):
-        x = random.randint(0,(self.w-BLOCK_SIZE)//BLOCK_SIZE)*BLOCK_SIZE
-        y = random.randint(0,(self.h-BLOCK_SIZE)//BLOCK_SIZE)*BLOCK_SIZE
-        self.food = Point(x,y)
-        if(self.food in self.snake):
-            self._place__food()
+        # Pick uniformly among the free cells: bounded cost, no recursion.
+        # Returns False when the snake fills the board and there is no cell left
+        snake_cells = set(self.snake)
+        free = [cell for cell in self._all_cells if cell not in snake_cells]
+        if not free:
+            return False
+        self.food = Point(*random.choice(free))
+        return True
 
 
     def play_step(self,action):
         self.frame_iteration+=1
         # 1. Collect the user input (only check every 10 frames to avoid threading issues)
-        if self.frame_iteration % 10 == 0:
+        if self.render and self.frame_iteration % 10 == 0:
             pygame.event.pump()  # This is safer than event.get() for threading
             if pygame.event.peek(pygame.QUIT):
                 pygame.quit()
@@ -90,60 +129,76 @@ class SnakeGameAI:
         if(self.head == self.food):
             self.score+=1
             reward=10
-            self._place__food()
+            if not self._place__food():
+                # Board full: the game is won
+                game_over=True
+                return reward,game_over,self.score
             
         else:
             self.snake.pop()
         
         # 5. Update UI and clock
-        self._update_ui()
-        self.clock.tick(SPEED)
+        if self.render:
+            self._update_ui()
+            self.clock.tick(SPEED)
         # 6. Return game Over and Display Score
         
         return reward,game_over,self.score
 
-    def _update_ui(self):
-        self.display.fill(BLACK)
+    def _render_background(self):
+        """Render the static background (watermark + decorations) once"""
+        surface = pygame.Surface((self.w,self.h))
+        surface.fill(BLACK)
 
         # Draw background "ANUJ" watermark
         bg_font = pygame.font.SysFont('arial', 72, bold=True)
         bg_text = bg_font.render("ANUJ", True, (50, 50, 50))  # Dark gray, semi-transparent effect
         text_rect = bg_text.get_rect(center=(self.w//2, self.h//2))
-        self.display.blit(bg_text, text_rect)
+        surface.blit(bg_text, text_rect)
 
         # Draw some alcohol glass icons on background
-        self._draw_background_alcohol()
+        self._draw_background_alcohol(surface)
+        return surface
 
-        for pt in self.snake:
-            pygame.draw.rect(self.display,BLUE1,pygame.Rect(pt.x,pt.y,BLOCK_SIZE,BLOCK_SIZE))
-            pygame.draw.rect(self.display,BLUE2,pygame.Rect(pt.x+4,pt.y+4,12,12))
-
-        # Draw food as alcohol bottle with "anuj" text
-        pygame.draw.rect(self.display,RED,pygame.Rect(self.food.x,self.food.y,BLOCK_SIZE,BLOCK_SIZE))
+    def _render_food(self):
+        """Render the food sprite (alcohol bottle on red) once"""
+        surface = pygame.Surface((BLOCK_SIZE,BLOCK_SIZE))
+        surface.fill(RED)
 
         # Draw alcohol bottle icon (simple bottle shape)
-        bottle_x = self.food.x + 2
-        bottle_y = self.food.y + 2
-        bottle_w = BLOCK_SIZE - 4
-        bottle_h = BLOCK_SIZE - 4
+        bottle_x = 2
+        bottle_y = 2
 
         # Bottle neck
-        pygame.draw.rect(self.display,BLACK,pygame.Rect(bottle_x + 6, bottle_y, 8, 4))
+        pygame.draw.rect(surface,BLACK,pygame.Rect(bottle_x + 6, bottle_y, 8, 4))
         # Bottle body
-        pygame.draw.rect(self.display,BLACK,pygame.Rect(bottle_x + 4, bottle_y + 4, 12, 10))
+        pygame.draw.rect(surface,BLACK,pygame.Rect(bottle_x + 4, bottle_y + 4, 12, 10))
         # Bottle base
-        pygame.draw.rect(self.display,BLACK,pygame.Rect(bottle_x + 2, bottle_y + 13, 16, 3))
+        pygame.draw.rect(surface,BLACK,pygame.Rect(bottle_x + 2, bottle_y + 13, 16, 3))
+        return surface
+
+    def _update_ui(self):
+        self.display.blit(self._bg_surface,(0,0))
+
+        # All segments in one blits() call instead of two draw calls per segment
+        self.display.blits([(self._seg_surf,(pt.x,pt.y)) for pt in self.snake],doreturn=False)
+
+        # Draw food as alcohol bottle with "anuj" text
+        self.display.blit(self._food_surf,(self.food.x,self.food.y))
 
         # "anuj" text in center
-        food_text = font.render("anuj",True,BLACK)
-        text_rect = food_text.get_rect(center=(self.food.x + BLOCK_SIZE//2, self.food.y + BLOCK_SIZE//2))
-        self.display.blit(food_text, text_rect)
+        text_rect = self._food_label.get_rect(center=(self.food.x + BLOCK_SIZE//2, self.food.y + BLOCK_SIZE//2))
+        self.display.blit(self._food_label, text_rect)
 
-        text = font.render("Score: "+str(self.score),True,WHITE)
-        self.display.blit(text,[0,0])
-        pygame.display.flip()
+        # Score text only needs re-rendering when the score changes
+        if self.score != self._score_value:
+            self._score_value = self.score
+            self._score_text = font.render("Score: "+str(self.score),True,WHITE)
+        self.display.blit(self._score_text,[0,0])
+        if self.render:
+            pygame.display.flip()
 
-    def _draw_background_alcohol(self):
+    def _draw_background_alcohol(self, surface):
         """Draw alcohol-themed background decorations"""
         # Draw some wine glasses in corners
         glass_positions = [(50, 50), (550, 50), (50, 400), (550, 400)]
@@ -151,11 +206,11 @@ class SnakeGameAI:
 
         for gx, gy in glass_positions:
             # Wine glass stem
-            pygame.draw.rect(self.display, glass_color, pygame.Rect(gx, gy+12, 2, 8))
+            pygame.draw.rect(surface, glass_color, pygame.Rect(gx, gy+12, 2, 8))
             # Wine glass base
-            pygame.draw.rect(self.display, glass_color, pygame.Rect(gx-4, gy+18, 10, 2))
+            pygame.draw.rect(surface, glass_color, pygame.Rect(gx-4, gy+18, 10, 2))
             # Wine glass bowl
-            pygame.draw.circle(self.display, glass_color, (gx+1, gy+8), 6, 1)
+            pygame.draw.circle(surface, glass_color, (gx+1, gy+8), 6, 1)
 
         # Draw beer mugs in other areas
         mug_positions = [(200, 100), (400, 350), (150, 300), (450, 150)]
@@ -163,11 +218,11 @@ class SnakeGameAI:
 
         for mx, my in mug_positions:
             # Mug body
-            pygame.draw.rect(self.display, mug_color, pygame.Rect(mx, my, 12, 15), 1)
+            pygame.draw.rect(surface, mug_color, pygame.Rect(mx, my, 12, 15), 1)
             # Mug handle
-            pygame.draw.circle(self.display, mug_color, (mx+12, my+7), 3, 1)
+            pygame.draw.circle(surface, mug_color, (mx+12, my+7), 3, 1)
             # Mug foam top
-            pygame.draw.line(self.display, mug_color, (mx+1, my+1), (mx+11, my+1))
+            pygame.draw.line(surface, mug_color, (mx+1, my+1), (mx+11, my+1))
 
     def _move(self,action):
         # Action
@@ -208,3 +263,21 @@ class SnakeGameAI:
         if(pt in self.snake[1:]):
             return True
         return False
+
+    @staticmethod
+    def is_collision_batch(games,points):
+        """Vectorized is_collision over N games: points is (N, K, 2), points[i] checked against games[i]"""
+        points = np.asarray(points,dtype=np.int64)
+        x = points[...,0]
+        y = points[...,1]
+        w = np.array([g.w for g in games])[:,None]
+        h = np.array([g.h for g in games])[:,None]
+        #hit boundary
+        hit = (x>w-BLOCK_SIZE) | (x<0) | (y>h-BLOCK_SIZE) | (y<0)
+
+        # Bodies (without heads) padded to a common length with a cell no point can match
+        bodies = np.full((len(games),max(len(g.snake) for g in games)-1,2),np.iinfo(np.int64).min)
+        for i,g in enumerate(games):
+            bodies[i,:len(g.snake)-1] = g.snake[1:]
+        hit |= (points[:,:,None,:] == bodies[:,None,:,:]).all(axis=-1).any(axis=-1)
+        return hit
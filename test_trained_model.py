@@ -8,7 +8,7 @@ import torch
 import random
 import numpy as np
 from collections import deque
-from snake_gameai import SnakeGameAI, Direction, Point, BLOCK_SIZE
+from snake_gameai import SnakeGameAI, Point, BLOCK_SIZE, DIRECTION_INDEX, DANGER_MASK
 from model import Linear_QNet, QTrainer
 from Helper import plot
 
@@ -19,20 +19,27 @@ LR = 0.001
 class TrainedAgent:
     """Agent that loads and uses the trained model for testing"""
 
-    def __init__(self):
+    def __init__(self, device='cpu'):
         self.n_game = 0
         self.epsilon = 0  # No exploration during testing
         self.gamma = 0.9
         self.memory = deque(maxlen=MAX_MEMORY)
 
         # Load the trained model
-        self.model = Linear_QNet(11, 256, 3)
+        # Inference is one 11-dim forward per frame, so it defaults to the CPU:
+        # a GPU round-trip costs more than the whole matmul
+        self.model = Linear_QNet(11, 256, 3, device=device)
+        torch.set_num_threads(1)  # Don't compete with pygame for cores
         self.trainer = QTrainer(self.model, lr=LR, gamma=self.gamma)
 
         # Load saved weights
         model_path = './models/model.pth'
         try:
-            self.model.load_state_dict(torch.load(model_path))
+            self.model.load_state_dict(torch.load(model_path, map_location=self.model.device))
+            # FP16 halves weight/activation traffic on GPU; CPU stays in FP32
+            self.dtype = torch.float16 if self.model.device.type == 'cuda' else torch.float32
+            self.model.to(self.dtype)
+            self.model.eval()
             print("🎯 SUCCESSFULLY LOADED TRAINED MODEL!")
             print(f"📁 Model loaded from: {model_path}")
         except FileNotFoundError:
@@ -48,54 +55,38 @@ class TrainedAgent:
         """Extract 11-dimensional state representation"""
         head = game.snake[0]
 
-        # Check points around head
-        point_l = Point(head.x - BLOCK_SIZE, head.y)
-        point_r = Point(head.x + BLOCK_SIZE, head.y)
-        point_u = Point(head.x, head.y - BLOCK_SIZE)
-        point_d = Point(head.x, head.y + BLOCK_SIZE)
+        # Check the 4 points around head once: [left, right, up, down]
+        collisions = np.array([
+            game.is_collision(Point(head.x - BLOCK_SIZE, head.y)),
+            game.is_collision(Point(head.x + BLOCK_SIZE, head.y)),
+            game.is_collision(Point(head.x, head.y - BLOCK_SIZE)),
+            game.is_collision(Point(head.x, head.y + BLOCK_SIZE)),
+        ], dtype=bool)
 
-        # Current direction flags
-        dir_l = game.direction == Direction.LEFT
-        dir_r = game.direction == Direction.RIGHT
-        dir_u = game.direction == Direction.UP
-        dir_d = game.direction == Direction.DOWN
+        # Current direction in the same layout
+        dir_idx = DIRECTION_INDEX[game.direction]
 
         # 11-dimensional state vector
-        state = [
-            # Danger Straight
-            (dir_u and game.is_collision(point_u)) or
-            (dir_d and game.is_collision(point_d)) or
-            (dir_l and game.is_collision(point_l)) or
-            (dir_r and game.is_collision(point_r)),
-
-            # Danger right
-            (dir_u and game.is_collision(point_r)) or
-            (dir_d and game.is_collision(point_l)) or
-            (dir_u and game.is_collision(point_u)) or
-            (dir_d and game.is_collision(point_d)),
-
-            # Danger Left
-            (dir_u and game.is_collision(point_r)) or
-            (dir_d and game.is_collision(point_l)) or
-            (dir_r and game.is_collision(point_u)) or
-            (dir_l and game.is_collision(point_d)),
-
-            # Direction flags
-            dir_l, dir_r, dir_u, dir_d,
-
-            # Food location relative to head
-            game.food.x < game.head.x,  # food left
-            game.food.x > game.head.x,  # food right
-            game.food.y < game.head.y,  # food up
-            game.food.y > game.head.y   # food down
-        ]
-
-        return np.array(state, dtype=int)
+        state = np.zeros(11, dtype=np.float32)
+
+        # Danger straight, right, left
+        state[0:3] = (DANGER_MASK[dir_idx] & collisions).any(axis=1)
+
+        # Direction flags
+        state[3 + dir_idx] = 1
+
+        # Food location relative to head
+        state[7] = game.food.x < head.x  # food left
+        state[8] = game.food.x > head.x  # food right
+        state[9] = game.food.y < head.y  # food up
+        state[10] = game.food.y > head.y  # food down
+
+        return state
 
     def get_action(self, state):
         """Get optimal action from trained model (no exploration)"""
         # Pure exploitation - use trained model only
-        state_tensor = torch.tensor(state, dtype=torch.float).to(self.model.device)
+        state_tensor = torch.as_tensor(state, dtype=self.dtype, device=self.model.device)
         with torch.no_grad():
             prediction = self.model(state_tensor)
 
@@ -123,8 +114,6 @@ def test_trained_model():
 
     try:
         while True:
-            games_played += 1
-
             # Get current state and best action
             state = agent.get_state(game)
             action = agent.get_action(state)
@@ -136,26 +125,27 @@ def test_trained_model():
                 # Game ended
                 game.reset()
                 agent.n_game += 1
+                games_played += 1
 
                 # Update statistics
                 total_score += score
                 max_score = max(max_score, score)
                 avg_score = total_score / games_played
 
-                print("2d"
+                print(f"🎮 Game {games_played:2d} | "
                       f"🏆 Best: {max_score} | 🎯 Current: {score}")
 
                 # Every 10 games, show detailed stats
                 if games_played % 10 == 0:
-                    print(".1f"
-                          "=" * 40)
+                    print(f"📈 Average Score: {avg_score:.1f}\n"
+                          + "=" * 40)
 
     except KeyboardInterrupt:
         print("\n" + "=" * 60)
         print("🎯 TESTING COMPLETE")
         print(f"📊 Games Played: {games_played}")
         print(f"🏆 Best Score: {max_score}")
-        print(f"📈 Average Score: {total_score/games_played:.1f}")
+        print(f"📈 Average Score: {total_score/max(games_played, 1):.1f}")
         print("💡 Your trained AI is working perfectly!")
 
 if __name__ == "__main__":
@@ -13,206 +13,292 @@ Perfect for:
 import torch
 import random
 import numpy as np
-from collections import deque
 import os
+import queue
+import threading
 
 # Disable graphics for maximum speed
 os.environ['SDL_VIDEODRIVER'] = 'dummy'
 
-from snake_gameai import Direction, Point, BLOCK_SIZE
-from model import Linear_QNet, QTrainer
+from snake_gameai import Point, BLOCK_SIZE
+from model import Linear_QNet, QTrainer, PrioritizedReplayBuffer
+from helpers_numba import state_flags
 
 # Ultra-optimized hyperparameters for GPU training
 MAX_MEMORY = 500_000  # Massive memory for GPU efficiency
 BATCH_SIZE = 4000     # HUGE batches for GPU parallelization
 LR = 0.001
+NUM_ENVS = 512        # Games stepped in parallel, one batched forward per step
+TRAIN_EVERY = 4       # Env steps between replay-batch training steps
+
+# Board size in cells
+GRID_W = 640 // BLOCK_SIZE
+GRID_H = 480 // BLOCK_SIZE
+# Single-bit uint32 masks per column, so clearing a bit never leaves the uint32 range
+CELL_BIT = np.left_shift(np.uint32(1), np.arange(GRID_W, dtype=np.uint32))
+
+# Directions as ints in clockwise order, with the head offset of one move in each
+DIR_RIGHT, DIR_DOWN, DIR_LEFT, DIR_UP = range(4)
+DIR_DELTA = ((BLOCK_SIZE, 0), (0, BLOCK_SIZE), (-BLOCK_SIZE, 0), (0, -BLOCK_SIZE))
+
+# Action index -> turn relative to the current direction: straight, right, left
+TURN = (0, 1, -1)
+
+class HeadlessGame:
+    def __init__(self):
+        self.direction = DIR_RIGHT
+        self.head = Point(320, 240)  # Center of 640x480
+        # Body as a ring buffer of (x, y) rows: the head is at _head_idx and
+        # moves forward, the tail is at _tail_idx
+        self._max_len = GRID_W * GRID_H + 1
+        self._body = np.empty((self._max_len, 2), dtype=np.int32)
+        self._body[:3] = [(self.head.x-(2*BLOCK_SIZE), self.head.y),
+                          (self.head.x-BLOCK_SIZE, self.head.y),
+                          self.head]
+        self._tail_idx = 0
+        self._head_idx = 2
+        self._len = 3
+        # Occupancy bitboard: bit col of row_mask[row] is set on cells covered by the snake
+        self.row_mask = np.zeros(GRID_H, dtype=np.uint32)
+        for x, y in self._body[:3]:
+            self.row_mask[y // BLOCK_SIZE] |= CELL_BIT[x // BLOCK_SIZE]
+        self.score = 0
+        self.food = None
+        self.frame_iteration = 0
+        self._place_food()
+
+    def _push_head(self, pt):
+        self._head_idx = (self._head_idx + 1) % self._max_len
+        self._body[self._head_idx] = pt
+        self._len += 1
+
+    def _pop_tail(self):
+        x, y = self._body[self._tail_idx]
+        self.row_mask[y // BLOCK_SIZE] &= ~CELL_BIT[x // BLOCK_SIZE]
+        self._tail_idx = (self._tail_idx + 1) % self._max_len
+        self._len -= 1
+
+    def _place_food(self):
+        """Returns False when the snake fills the board and there is no cell left"""
+        if 2 * self._len > GRID_W * GRID_H:
+            # Crowded board: pick uniformly among the free cells of the bitboard
+            taken = (self.row_mask[:, None] & CELL_BIT) != 0
+            free = np.flatnonzero(~taken)
+            if len(free) == 0:
+                return False
+            cy, cx = divmod(int(free[random.randrange(len(free))]), GRID_W)
+        else:
+            # At least half the board is free, so rejection sampling ends quickly
+            while True:
+                cx = random.randint(0, GRID_W - 1)
+                cy = random.randint(0, GRID_H - 1)
+                if not self.row_mask[cy] & CELL_BIT[cx]:
+                    break
+        self.food = Point(cx * BLOCK_SIZE, cy * BLOCK_SIZE)
+        return True
+
+    def reset(self):
+        self.__init__()
+
+    def _move(self, action):
+        """Move snake based on action"""
+        self.direction = (self.direction + TURN[action]) % 4
+        dx, dy = DIR_DELTA[self.direction]
+        self.head = Point(self.head.x + dx, self.head.y + dy)
+
+    def play_step_headless(self, action):
+        """Ultra-fast game step without graphics"""
+        self.frame_iteration += 1
+
+        # Move snake
+        self._move(action)
+        cx = self.head.x // BLOCK_SIZE
+        cy = self.head.y // BLOCK_SIZE
+        # Wall, or self collision before the new head joins the bitboard
+        hit = not (0 <= cx < GRID_W and 0 <= cy < GRID_H) or self.row_mask[cy] & CELL_BIT[cx]
+        self._push_head(self.head)
+
+        # Check game over conditions
+        if (hit or self.frame_iteration > 100 * self._len):
+            return -1, True, self.score
+        self.row_mask[cy] |= CELL_BIT[cx]
+
+        # Check food collision
+        if self.head == self.food:
+            self.score += 1
+            # Board full: the game is won
+            if not self._place_food():
+                return 10, True, self.score
+            return 10, False, self.score
+        else:
+            self._pop_tail()
+            return 0, False, self.score
+
+def encode_state(game, out):
+    """Write the 11 state flags of `game` into the int8 row `out`"""
+    state_flags(game.head.x // BLOCK_SIZE, game.head.y // BLOCK_SIZE,
+                game.food.x // BLOCK_SIZE, game.food.y // BLOCK_SIZE,
+                game.direction, game.row_mask, GRID_W, out)
+
+
+class VectorHeadlessEnv:
+    """N headless games stepped together, with states kept as one [N, 11] int8 array"""
+    def __init__(self, num_envs=NUM_ENVS):
+        self.games = [HeadlessGame() for _ in range(num_envs)]
+        self.states = np.zeros((num_envs, 11), dtype=np.int8)
+        self._next_states = np.zeros_like(self.states)
+        self._start_states = np.zeros_like(self.states)
+        self._rewards = np.zeros(num_envs, dtype=np.float32)
+        self._dones = np.zeros(num_envs, dtype=bool)
+        self._scores = np.zeros(num_envs, dtype=np.int32)
+        for game, row in zip(self.games, self.states):
+            encode_state(game, row)
+
+    def step(self, actions):
+        """Apply one action per game; returns (next_states, rewards, dones, scores).
+
+        next_states holds the terminal state for finished games, which are reset
+        right away; env.states then holds the states the next step starts from.
+        """
+        next_states, start_states = self._next_states, self._start_states
+        for i, (game, action) in enumerate(zip(self.games, actions)):
+            self._rewards[i], self._dones[i], self._scores[i] = game.play_step_headless(action)
+            encode_state(game, next_states[i])
+
+        np.copyto(start_states, next_states)
+        for i in np.flatnonzero(self._dones):
+            self.games[i].reset()
+            encode_state(self.games[i], start_states[i])
+
+        # The old states array is reused for the step after next
+        self._start_states = self.states
+        self.states = start_states
+        return next_states, self._rewards, self._dones, self._scores
+
+
+class AsyncCollector:
+    """Steps a VectorHeadlessEnv on a background thread, so env stepping overlaps the
+    learner's GPU work. The states for the next forward pass go through one of two
+    pinned buffers and are copied to the device on the collector's own CUDA stream."""
+    def __init__(self, env, device):
+        self.env = env
+        self.device = device
+        self._cuda = device.type == 'cuda'
+        if self._cuda:
+            n = len(env.games)
+            self._pack = [torch.empty((n, 11), dtype=torch.float32, pin_memory=True) for _ in range(2)]
+            self._pack_dev = [torch.empty((n, 11), dtype=torch.float32, device=device) for _ in range(2)]
+            self._stream = torch.cuda.Stream(device)
+            self._copied = [torch.cuda.Event() for _ in range(2)]
+        self._cold = 0
+        self.states, self.ready = self._stage()
+
+        self._actions = queue.Queue(maxsize=1)
+        self._results = queue.Queue(maxsize=1)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _stage(self):
+        """Device tensor of env.states, filled through the cold buffer pair, and the
+        event its reader's stream must wait on (None without CUDA)"""
+        if not self._cuda:
+            return torch.from_numpy(self.env.states).float(), None
+        slot = self._cold
+        self._cold ^= 1
+        # Only wait when a slot is reused: its copy from two steps ago must be done
+        # reading the pinned buffer. Its device tensor's reader is done as well, since
+        # get_action syncs on its result before the next step is submitted
+        self._copied[slot].synchronize()
+        self._pack[slot].copy_(torch.from_numpy(self.env.states))
+        with torch.cuda.stream(self._stream):
+            self._pack_dev[slot].copy_(self._pack[slot], non_blocking=True)
+            self._copied[slot].record()
+        return self._pack_dev[slot], self._copied[slot]
+
+    def _run(self):
+        while True:
+            actions = self._actions.get()
+            try:
+                step = self.env.step(actions)
+                self._results.put((step, self._stage()))
+            except Exception as e:
+                self._results.put((e, (None, None)))
+
+    def submit(self, actions):
+        """Start stepping every game with `actions`; env.states must not be read until result()"""
+        self._actions.put(actions)
+
+    def result(self):
+        """(next_states, rewards, dones, scores) of the submitted step; also refreshes
+        self.states and self.ready"""
+        step, staged = self._results.get()
+        if isinstance(step, Exception):
+            raise step
+        self.states, self.ready = staged
+        return step
+
 
 class HeadlessAgent:
     def __init__(self):
         self.n_game = 0
         self.epsilon = 0
         self.gamma = 0.9
-        self.memory = deque(maxlen=MAX_MEMORY)
 
         # Force maximum GPU optimization
         if torch.cuda.is_available():
             print("🚀 MAXIMUM GPU MODE ACTIVATED!")
             print("🎯 Ultra-fast headless training enabled")
-            torch.cuda.empty_cache()
-            torch.backends.cudnn.benchmark = True
-            torch.backends.cudnn.deterministic = False
+            # The model is all matmuls (no convolutions for cuDNN to tune); TF32 speeds them up on Ampere+
+            torch.backends.cuda.matmul.allow_tf32 = True
             # Use pinned memory for 10x faster CPU→GPU transfers
             torch.cuda.set_device(0)
         else:
             print("⚠️ WARNING: No CUDA GPU detected! This mode requires GPU for performance.")
 
-        # Optimized model with GPU acceleration
-        self.model = Linear_QNet(11, 256, 3)
+        # Optimized model with GPU acceleration; the loop only uses the
+        # [NUM_ENVS, 11] and [BATCH_SIZE, 11] shapes, so they are compiled statically
+        self.model = Linear_QNet(11, 256, 3, static_shapes=True)
         self.trainer = QTrainer(self.model, lr=LR, gamma=self.gamma)
         self.device = self.model.device
 
+        # Prioritized replay memory as preallocated arrays; the binary state flags fit in int8.
+        # Experiences arrive NUM_ENVS at a time, so the buffer is kept on the device
+        self.memory = PrioritizedReplayBuffer(MAX_MEMORY, state_dtype=torch.int8, device=self.device,
+                                              on_device=True)
+
         print(f"💪 Using device: {self.device}")
         print(f"📊 Memory capacity: {MAX_MEMORY:,} experiences")
         print(f"🎯 Batch size: {BATCH_SIZE}")
         print("=" * 60)
 
-    def create_headless_game(self):
-        """Create a lightweight game state without graphics"""
-        class HeadlessGame:
-            def __init__(self):
-                self.direction = Direction.RIGHT
-                self.head = Point(320, 240)  # Center of 640x480
-                self.snake = [self.head,
-                             Point(self.head.x-BLOCK_SIZE, self.head.y),
-                             Point(self.head.x-(2*BLOCK_SIZE), self.head.y)]
-                self.score = 0
-                self.food = None
-                self.frame_iteration = 0
-                self._place_food()
-
-            def _place_food(self):
-                x = random.randint(0, (640-BLOCK_SIZE)//BLOCK_SIZE) * BLOCK_SIZE
-                y = random.randint(0, (480-BLOCK_SIZE)//BLOCK_SIZE) * BLOCK_SIZE
-                self.food = Point(x, y)
-                if self.food in self.snake:
-                    self._place_food()
-
-            def reset(self):
-                self.__init__()
-
-            def is_collision(self, pt=None):
-                if pt is None:
-                    pt = self.head
-                # Wall collision
-                if (pt.x > 640-BLOCK_SIZE or pt.x < 0 or
-                    pt.y > 480-BLOCK_SIZE or pt.y < 0):
-                    return True
-                # Self collision
-                if pt in self.snake[1:]:
-                    return True
-                return False
-
-            def _move(self, action):
-                """Move snake based on action"""
-                clock_wise = [Direction.RIGHT, Direction.DOWN, Direction.LEFT, Direction.UP]
-                idx = clock_wise.index(self.direction)
-                if np.array_equal(action, [1, 0, 0]):
-                    new_dir = clock_wise[idx]  # Straight
-                elif np.array_equal(action, [0, 1, 0]):
-                    next_idx = (idx + 1) % 4
-                    new_dir = clock_wise[next_idx]  # Right turn
-                else:
-                    next_idx = (idx - 1) % 4
-                    new_dir = clock_wise[next_idx]  # Left turn
-                self.direction = new_dir
-
-                x = self.head.x
-                y = self.head.y
-                if self.direction == Direction.RIGHT:
-                    x += BLOCK_SIZE
-                elif self.direction == Direction.LEFT:
-                    x -= BLOCK_SIZE
-                elif self.direction == Direction.DOWN:
-                    y += BLOCK_SIZE
-                elif self.direction == Direction.UP:
-                    y -= BLOCK_SIZE
-                self.head = Point(x, y)
-
-            def play_step_headless(self, action):
-                """Ultra-fast game step without graphics"""
-                self.frame_iteration += 1
-
-                # Move snake
-                self._move(action)
-                self.snake.insert(0, self.head)
-
-                # Check game over conditions
-                if (self.is_collision() or self.frame_iteration > 100 * len(self.snake)):
-                    return -1, True, self.score
-
-                # Check food collision
-                if self.head == self.food:
-                    self.score += 1
-                    self._place_food()
-                    return 10, False, self.score
-                else:
-                    self.snake.pop()
-                    return 0, False, self.score
-
-        return HeadlessGame()
-
-    def get_state(self, game):
-        head = game.snake[0]
-        point_l = Point(head.x - BLOCK_SIZE, head.y)
-        point_r = Point(head.x + BLOCK_SIZE, head.y)
-        point_u = Point(head.x, head.y - BLOCK_SIZE)
-        point_d = Point(head.x, head.y + BLOCK_SIZE)
-
-        dir_l = game.direction == Direction.LEFT
-        dir_r = game.direction == Direction.RIGHT
-        dir_u = game.direction == Direction.UP
-        dir_d = game.direction == Direction.DOWN
-
-        state = [
-            # Danger detection
-            (dir_u and game.is_collision(point_u)) or
-            (dir_d and game.is_collision(point_d)) or
-            (dir_l and game.is_collision(point_l)) or
-            (dir_r and game.is_collision(point_r)),
-
-            (dir_u and game.is_collision(point_r)) or
-            (dir_d and game.is_collision(point_l)) or
-            (dir_u and game.is_collision(point_u)) or
-            (dir_d and game.is_collision(point_d)),
-
-            (dir_u and game.is_collision(point_r)) or
-            (dir_d and game.is_collision(point_l)) or
-            (dir_r and game.is_collision(point_u)) or
-            (dir_l and game.is_collision(point_d)),
-
-            # Direction flags
-            dir_l, dir_r, dir_u, dir_d,
-
-            # Food location
-            game.food.x < game.head.x,
-            game.food.x > game.head.x,
-            game.food.y < game.head.y,
-            game.food.y > game.head.y
-        ]
-        return np.array(state, dtype=int)
-
-    def get_action(self, state):
+    def get_action(self, state_tensor, ready=None):
+        """Action indices [N] for a float32 batch of states on the device, from a single forward pass.
+        `ready` is an optional CUDA event marking the end of the copy that filled state_tensor"""
         self.epsilon = max(5, 80 - self.n_game)  # Minimum 5% exploration
-        final_move = [0, 0, 0]
-
-        if random.randint(0, 200) < self.epsilon:
-            move = random.randint(0, 2)
-            final_move[move] = 1
-        else:
-            state_tensor = torch.tensor(state, dtype=torch.float).to(self.device)
-            with torch.no_grad():  # Faster inference
-                prediction = self.model(state_tensor)
-            move = torch.argmax(prediction).item()
-            final_move[move] = 1
+        n = len(state_tensor)
 
-        return final_move
+        if ready is not None:
+            # Order the forward after the copy on the GPU, without blocking the host
+            torch.cuda.current_stream(self.device).wait_event(ready)
 
-    def remember(self, state, action, reward, next_state, done):
-        """Store experience in replay memory"""
-        self.memory.append((state, action, reward, next_state, done))
+        with torch.no_grad(), torch.autocast(self.device.type, dtype=self.model.amp_dtype,
+                                             enabled=self.model.use_amp):  # Faster inference
+            prediction = self.model(state_tensor)
 
-    def train_long_memory(self):
-        if len(self.memory) > BATCH_SIZE:
-            mini_sample = random.sample(self.memory, BATCH_SIZE)
-        else:
-            mini_sample = self.memory
+        # Exploration decided for all games on the device, one transfer back
+        explore = torch.randint(0, 201, (n,), device=self.device) < self.epsilon
+        random_moves = torch.randint(0, 3, (n,), device=self.device)
+        moves = torch.where(explore, random_moves, prediction.argmax(dim=1))
+        return moves.cpu().numpy()
 
-        states, actions, rewards, next_states, dones = zip(*mini_sample)
-        self.trainer.train_step(states, actions, rewards, next_states, dones)
+    def remember(self, states, actions, rewards, next_states, dones):
+        """Store a batch of experiences in replay memory"""
+        self.memory.push_batch(states, actions, rewards, next_states, dones)
 
-    def train_short_memory(self, state, action, reward, next_state, done):
-        """Train on single experience"""
-        self.trainer.train_step(state, action, reward, next_state, done)
+    def train_long_memory(self):
+        states, actions, rewards, next_states, dones, idx, weights = self.memory.sample(BATCH_SIZE)
+        td_errors = self.trainer.train_step(states, actions, rewards, next_states, dones, weights)
+        self.memory.update_priorities(idx, td_errors.cpu().numpy())
 
 def train_ultra_fast():
     """GPU-optimized training loop with maximum speed"""
@@ -221,42 +307,46 @@ def train_ultra_fast():
     print("=" * 60)
 
     agent = HeadlessAgent()
-    game = agent.create_headless_game()
+    env = VectorHeadlessEnv(NUM_ENVS)
+    collector = AsyncCollector(env, agent.device)
 
     scores = []
     total_score = 0
     record = 0
-    games_per_print = 50  # Print stats every N games
+    games_per_print = 500  # Print stats every N games
+    games_per_gpu_stats = 5000  # memory_allocated syncs the device, so query it rarely
 
     try:
         game_counter = 0
+        step_counter = 0
         while True:
-            game_counter += 1
-            agent.n_game += 1
+            step_counter += 1
+
+            # One batched action for every game
+            states = env.states
+            actions = agent.get_action(collector.states, collector.ready)
 
-            # Get initial state and action
-            state_old = agent.get_state(game)
-            action = agent.get_action(state_old)
+            # Execute actions on the collector thread
+            collector.submit(actions)
 
-            # Execute action and get new state
-            reward, done, score = game.play_step_headless(action)
-            if done:
-                reward = -10  # Death penalty
-            elif reward > 0:
-                reward = 10   # Food bonus
+            # Meanwhile, train only on full replay batches, every few steps; a fixed
+            # batch shape lets the compiled model replay one CUDA graph
+            if step_counter % TRAIN_EVERY == 0 and len(agent.memory) >= BATCH_SIZE:
+                agent.train_long_memory()
 
-            state_new = agent.get_state(game)
+            next_states, rewards, dones, game_scores = collector.result()
+            rewards[rewards < 0] = -10  # Death penalty; food (and a won game) already pays 10
 
             # Store in memory
-            agent.remember(state_old, action, reward, state_new, done)
+            agent.remember(states, actions, rewards, next_states, dones)
 
-            # Train on individual experience
-            agent.train_short_memory(state_old, action, reward, state_new, done)
+            if not dones.any():
+                continue
 
-            if done:
-                # Game ended - reset and train on batch
-                game.reset()
-                agent.train_long_memory()
+            # Games ended (already reset by the env)
+            for score in game_scores[dones].tolist():
+                game_counter += 1
+                agent.n_game += 1
 
                 # Update statistics
                 if score > record:
@@ -271,15 +361,11 @@ def train_ultra_fast():
                 if game_counter % games_per_print == 0:
                     mean_score = total_score / agent.n_game
                     gpu_usage = ""
-                    if torch.cuda.is_available():
+                    if torch.cuda.is_available() and game_counter % games_per_gpu_stats == 0:
                         gpu_usage = f" | GPU: {torch.cuda.memory_allocated()/1024**3:.1f}GB"
-                    print(".1f"
+                    print(f"🎮 Game {agent.n_game} | Mean: {mean_score:.1f} | "
                           f"Best: {record} | ε: {agent.epsilon:.1f}%{gpu_usage}")
 
-                    # Memory management
-                    if torch.cuda.is_available():
-                        torch.cuda.empty_cache()
-
     except KeyboardInterrupt:
         print("\n⏹️ Training interrupted by user")
         agent.model.save()